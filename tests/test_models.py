@@ -0,0 +1,73 @@
+import msgspec
+
+from vastai_client.models import (
+    Instance,
+    InstanceCache,
+    InstanceState,
+    Verification,
+    dumps,
+    instances_decoder,
+)
+
+
+def decode(body: bytes) -> list[Instance]:
+    """Decode an `/instances` response body."""
+    return instances_decoder.decode(body).instances
+
+
+def test_instance_cache_keeps_identity() -> None:
+    """The same id keeps its object, with changed fields overwritten."""
+    cache = InstanceCache()
+    (first,) = cache.update(decode(b'{"instances": [{"id": 1, "label": "a"}]}'))
+    (second,) = cache.update(decode(b'{"instances": [{"id": 1, "label": "b"}]}'))
+    assert second is first
+    assert second.label == 'b'
+
+
+def test_instance_cache_resets_missing_fields() -> None:
+    """Fields missing from the latest response go back to their defaults."""
+    cache = InstanceCache()
+    (inst,) = cache.update(
+        decode(b'{"instances": [{"id": 1, "ssh_port": 22, "ports": [80]}]}')
+    )
+    cache.update(decode(b'{"instances": [{"id": 1}]}'))
+    assert inst.ssh_port is None
+    assert inst.ports == ()
+
+
+def test_instance_cache_evicts_least_recently_used() -> None:
+    """Past `maxsize`, the instance seen longest ago is dropped."""
+    cache = InstanceCache(maxsize=2)
+    one, two = cache.update([Instance(id=1), Instance(id=2)])
+    cache.update([Instance(id=1)])
+    cache.update([Instance(id=3)])
+    assert cache.update([Instance(id=1)])[0] is one
+    assert cache.update([Instance(id=2)])[0] is not two
+
+
+def test_instance_cache_invalidate() -> None:
+    """An invalidated id is decoded afresh on the next update."""
+    cache = InstanceCache()
+    (inst,) = cache.update([Instance(id=1)])
+    cache.invalidate(1)
+    cache.invalidate(2)
+    assert cache.update([Instance(id=1)])[0] is not inst
+
+
+def test_known_statuses_decode_to_enums() -> None:
+    """Known statuses become enum members; unknown ones stay plain strings."""
+    body = (
+        b'{"instances": [{"id": 1, "cur_state": "running",'
+        b' "actual_status": "weird", "verification": "verified"}]}'
+    )
+    (inst,) = decode(body)
+    assert inst.cur_state is InstanceState.RUNNING
+    assert inst.verification is Verification.VERIFIED
+    assert type(inst.actual_status) is str
+    assert inst.actual_status == 'weird'
+    assert msgspec.json.decode(dumps(inst)) == {
+        'id': 1,
+        'actual_status': 'weird',
+        'cur_state': 'running',
+        'verification': 'verified',
+    }
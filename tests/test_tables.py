@@ -0,0 +1,41 @@
+import pytest
+
+from vastai_client.models import Machine
+
+np = pytest.importorskip('numpy')
+
+from vastai_client.tables import MachineTable  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    ('key', 'descending', 'expected'),
+    [
+        ('gpu_ram', False, [2, 0]),
+        ('gpu_ram', True, [0, 2]),
+        ('dph_total', False, [0, 2]),
+        ('dph_total', True, [2, 0]),
+    ],
+)
+def test_top_k_puts_missing_last(
+    key: str, descending: bool, expected: list[int]
+) -> None:
+    """Missing values are never picked ahead of real ones."""
+    table = MachineTable.from_instances([
+        Machine(gpu_ram=24000, dph_total=0.5),
+        Machine(),
+        Machine(gpu_ram=8000, dph_total=1.5),
+    ])
+    assert table.top_k(key, 2, descending=descending).tolist() == expected
+
+
+def test_values_are_not_truncated() -> None:
+    """Fractional and unusually large values are stored as given."""
+    table = MachineTable.from_instances([
+        Machine(pci_gen=3.5, num_gpus=300, cpu_cores=70000, gpu_lanes=1000),
+        Machine(),
+    ])
+    assert table.pci_gen[0] == 3.5
+    assert np.isnan(table.pci_gen[1])
+    assert table.num_gpus.tolist() == [300, 0]
+    assert table.cpu_cores[0] == 70000
+    assert table.gpu_lanes[0] == 1000
@@ -0,0 +1,389 @@
+import json
+import threading
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+from loguru import logger
+
+from vastai_client.vast_client import VastClient
+
+
+@dataclass
+class FakeServer:
+
+    """Local stand-in for the Vast.ai API.
+
+    `responses` maps a path to the (status, body) pairs it answers with, in
+    order; the last pair repeats. A key of the form 'HEAD /path' applies to
+    that method only. `redirects` maps a path to the location it answers
+    with a 302. Unknown paths get a 404. Every request is recorded as
+    (method, path, query).
+    """
+
+    url: str
+    responses: dict[str, list[tuple[int, bytes]]] = field(default_factory=dict)
+    redirects: dict[str, str] = field(default_factory=dict)
+    requests: list[tuple[str, str, dict[str, list[str]]]] = field(
+        default_factory=list
+    )
+
+    def sent(self, method: str, path: str) -> int:
+        """Number of `method` requests received for `path`."""
+        return sum(1 for m, p, _ in self.requests if (m, p) == (method, path))
+
+
+@pytest.fixture()
+def server() -> Iterator[FakeServer]:
+    """Serve canned responses on a random local port."""
+    fake = FakeServer(url='')
+
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, with_body: bool) -> None:
+            parts = urlsplit(self.path)
+            fake.requests.append((self.command, parts.path, parse_qs(parts.query)))
+            length = int(self.headers.get('Content-Length') or 0)
+            self.rfile.read(length)
+            if parts.path in fake.redirects:
+                self.send_response(302)
+                self.send_header('Location', fake.redirects[parts.path])
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            queue = fake.responses.get(
+                f'{self.command} {parts.path}',
+                fake.responses.get(parts.path, [(404, b'')]),
+            )
+            status, body = queue.pop(0) if len(queue) > 1 else queue[0]
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if with_body:
+                self.wfile.write(body)
+
+        def do_GET(self) -> None:  # noqa: N802
+            self._respond(with_body=True)
+
+        def do_HEAD(self) -> None:  # noqa: N802
+            self._respond(with_body=False)
+
+        def do_PUT(self) -> None:  # noqa: N802
+            self._respond(with_body=True)
+
+        def do_DELETE(self) -> None:  # noqa: N802
+            self._respond(with_body=True)
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    fake.url = f'http://127.0.0.1:{httpd.server_port}'
+    thread = threading.Thread(
+        target=httpd.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True
+    )
+    thread.start()
+    yield fake
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture()
+def client(server: FakeServer) -> Iterator[VastClient]:
+    """Client talking to the fake server."""
+    with VastClient(api_key='secret', url=server.url) as vast:
+        yield vast
+
+
+def test_get_is_retried(server: FakeServer, client: VastClient) -> None:
+    """A transient 503 on a read is retried."""
+    server.responses['/api/v0/instances'] = [
+        (503, b''),
+        (200, b'{"instances": [{"id": 1}]}'),
+    ]
+    assert [inst.id for inst in client.get_instances()] == [1]
+    assert server.sent('GET', '/api/v0/instances') == 2
+
+
+@pytest.mark.parametrize(
+    ('method', 'path', 'call'),
+    [
+        ('PUT', '/api/v0/instances/reboot/1/', lambda c: c.reboot_instance(1)),
+        ('PUT', '/api/v0/asks/1/', lambda c: c.create_instance(1, 'image')),
+        ('PUT', '/api/v0/commands/rsync/', lambda c: c.copy('1:/a', '2:/b')),
+        ('PUT', '/api/v0/instances/command/1/', lambda c: c.execute(1, 'ls')),
+        ('DELETE', '/api/v0/instances/1/', lambda c: c.destroy_instance(1)),
+    ],
+)
+def test_non_idempotent_requests_are_sent_once(
+    server: FakeServer,
+    client: VastClient,
+    method: str,
+    path: str,
+    call: Callable[[VastClient], object],
+) -> None:
+    """Requests that must not run twice are never retried."""
+    server.responses[path] = [(503, b'')]
+    with pytest.raises(requests.HTTPError):
+        call(client)
+    assert server.sent(method, path) == 1
+
+
+def test_api_key_stays_off_static_logs(
+    server: FakeServer, client: VastClient
+) -> None:
+    """The api key goes to the API as a param, but not to the static log file."""
+    server.responses['/api/v0/instances/request_logs/1/'] = [
+        (200, b'{"success": true, "msg": "ok"}'),
+    ]
+    server.responses['/static/docker_logs/C1.log'] = [(200, b'log line')]
+    assert client.logs(1, '10')
+    for _, path, query in server.requests:
+        if path.startswith('/api/'):
+            assert query['api_key'] == ['secret']
+        else:
+            assert 'api_key' not in query
+    assert server.sent('HEAD', '/static/docker_logs/C1.log') == 1
+    assert server.sent('GET', '/static/docker_logs/C1.log') == 1
+
+
+@pytest.mark.parametrize(
+    ('head', 'heads', 'gets'),
+    [
+        # The redirect is followed by the probe and by the download.
+        (None, 2, 2),
+        # A host that refuses HEAD gets one GET instead.
+        ((405, b''), 1, 1),
+        ((403, b''), 1, 1),
+    ],
+)
+def test_logs_reach_redirected_or_head_refusing_hosts(
+    server: FakeServer,
+    client: VastClient,
+    head: tuple[int, bytes] | None,
+    heads: int,
+    gets: int,
+) -> None:
+    """Logs are found behind a redirect and on hosts that refuse HEAD."""
+    server.responses['/api/v0/instances/request_logs/1/'] = [
+        (200, b'{"success": true, "msg": "ok"}'),
+    ]
+    if head is None:
+        server.redirects['/static/docker_logs/C1.log'] = '/files/C1.log'
+        server.responses['/files/C1.log'] = [(200, b'log line')]
+    else:
+        server.responses['HEAD /static/docker_logs/C1.log'] = [head]
+        server.responses['/static/docker_logs/C1.log'] = [(200, b'log line')]
+    assert client.logs(1, '10')
+    assert sum(1 for m, *_ in server.requests if m == 'HEAD') == heads
+    assert sum(1 for m, *_ in server.requests if m == 'GET') == gets
+
+
+def test_bulk_destroy_reports_every_id(
+    server: FakeServer, client: VastClient
+) -> None:
+    """A failing id is reported as False without hiding the other results."""
+    ok = [(200, b'{"success": true}')]
+    server.responses['/api/v0/instances/1/'] = ok
+    server.responses['/api/v0/instances/3/'] = [(200, b'<html></html>')]
+    server.responses['/api/v0/instances/4/'] = [(200, b'{}')]
+    server.responses['/api/v0/instances/5/'] = ok
+    assert client.destroy_instances([1, 2, 3, 4, 5]) == {
+        1: True,
+        2: False,
+        3: False,
+        4: False,
+        5: True,
+    }
+
+
+@pytest.mark.parametrize(
+    ('path', 'call'),
+    [
+        ('/api/v0/instances/reboot/1/', lambda c: c.reboot_instance(1)),
+        ('/api/v0/asks/1/', lambda c: c.create_instance(1, 'image')),
+        ('/api/v0/instances', lambda c: c.get_instances()),
+        ('/api/v0/machines', lambda c: c.get_hosted_machines(quiet=False)),
+    ],
+)
+def test_malformed_reply_is_a_request_exception(
+    server: FakeServer,
+    client: VastClient,
+    path: str,
+    call: Callable[[VastClient], object],
+) -> None:
+    """A 200 that is not JSON raises a RequestException, like Response.json did."""
+    server.responses[path] = [(200, b'<html>maintenance</html>')]
+    with pytest.raises(requests.exceptions.InvalidJSONError):
+        call(client)
+
+
+def test_get_instances_returns_snapshots(
+    server: FakeServer, client: VastClient
+) -> None:
+    """Plain calls return fresh objects; reuse_objects keeps identity per id."""
+    server.responses['/api/v0/instances'] = [
+        (200, b'{"instances": [{"id": 1, "cur_state": "loading"}]}'),
+        (200, b'{"instances": [{"id": 1, "cur_state": "running"}]}'),
+        (200, b'{"instances": [{"id": 1, "cur_state": "stopped"}]}'),
+    ]
+    (before,) = client.get_instances()
+    (after,) = client.get_instances(reuse_objects=True)
+    assert before.cur_state == 'loading'
+    assert after.cur_state == 'running'
+    (again,) = client.get_instances(reuse_objects=True)
+    assert again is after
+    assert after.cur_state == 'stopped'
+
+
+@pytest.fixture()
+def messages() -> Iterator[list[str]]:
+    """Messages logged while the test runs."""
+    logged: list[str] = []
+    sink = logger.add(lambda m: logged.append(m.record['message']), format='{message}')
+    yield logged
+    logger.remove(sink)
+
+
+machine_rows = [
+    {'id': 2, 'gpu_name': 'RTX 3090', 'dph_total': 0.1, 'listed': True},
+    {'id': 1, 'num_gpus': 4, 'extra': None, 'ports': [22, 80]},
+]
+
+
+@pytest.mark.parametrize(
+    ('quiet', 'raw', 'expected'),
+    [
+        (False, True, [json.dumps(machine_rows, indent=1, sort_keys=True)]),
+        (True, False, ['2\n1']),
+        (
+            False,
+            False,
+            ['2 machines: ']
+            + [
+                f"{row['id']}: {json.dumps(row, indent=4, sort_keys=True)}"
+                for row in machine_rows
+            ],
+        ),
+    ],
+)
+def test_show_hosted_machines(
+    server: FakeServer,
+    client: VastClient,
+    messages: list[str],
+    quiet: bool,
+    raw: bool,
+    expected: list[str],
+) -> None:
+    """Output matches json.dumps of the rows, and the count is logged once."""
+    body = json.dumps({'machines': machine_rows}).encode()
+    server.responses['/api/v0/machines'] = [(200, body)]
+    client.show_hosted_machines(quiet=quiet, raw=raw)
+    assert messages == expected
+
+
+instances_body = (
+    b'{"instances": [{"id": 1, "ssh_host": "h1", "ssh_port": 22},'
+    b' {"id": 2, "ssh_host": "h2", "ssh_port": 2222}]}'
+)
+
+
+def test_ssh_and_scp_url_share_one_fetch(
+    server: FakeServer, client: VastClient
+) -> None:
+    """Back to back url helpers send a single /instances request."""
+    server.responses['/api/v0/instances'] = [(200, instances_body)]
+    assert client.ssh_url(1) == 'ssh://root@h1:22'
+    assert client.scp_url(2) == 'scp://root@h2:2222'
+    assert server.sent('GET', '/api/v0/instances') == 1
+
+
+def test_instances_snapshot_expires(
+    server: FakeServer, client: VastClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """The shared fetch is redone after the ttl and after a destroy."""
+    server.responses['/api/v0/instances'] = [(200, instances_body)]
+    server.responses['/api/v0/instances/2/'] = [(200, b'{"success": true}')]
+    now = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    client.ssh_url(1)
+    now[0] += 5
+    client.ssh_url(1)
+    assert server.sent('GET', '/api/v0/instances') == 2
+    assert client.destroy_instance(2)
+    client.ssh_url(1)
+    assert server.sent('GET', '/api/v0/instances') == 3
+
+
+@pytest.mark.parametrize(
+    ('body', 'instance_id', 'expected'),
+    [
+        (instances_body, 3, None),
+        (instances_body, 0, None),
+        (
+            b'{"instances": [{"id": 1, "ssh_host": "h", "ssh_port": 1}]}',
+            0,
+            'ssh://root@h:1',
+        ),
+    ],
+)
+def test_ssh_url_picks_instance(
+    server: FakeServer,
+    client: VastClient,
+    body: bytes,
+    instance_id: int,
+    expected: str | None,
+) -> None:
+    """An unknown id, or no id with several instances, gives None."""
+    server.responses['/api/v0/instances'] = [(200, body)]
+    assert client.ssh_url(instance_id) == expected
+
+
+def test_search_offers_query(server: FakeServer, client: VastClient) -> None:
+    """The filters, sort order and type are sent as json in the q param."""
+    server.responses['/api/v0/bundles'] = [(200, b'{"offers": [{"id": 7}]}')]
+    offers = client.search_offers(
+        search_query='gpu_ram>=24', sort_order='dph-,num_gpus'
+    )
+    assert [offer.id for offer in offers] == [7]
+    ((_, _, query),) = server.requests
+    assert query['api_key'] == ['secret']
+    assert json.loads(query['q'][0]) == {
+        'verified': {'eq': True},
+        'external': {'eq': False},
+        'rentable': {'eq': True},
+        'gpu_ram': {'gte': '24000'},
+        'order': [['dph_total', 'desc'], ['num_gpus', 'asc']],
+        'type': 'on-demand',
+    }
+
+
+def test_search_offers_options(server: FakeServer, client: VastClient) -> None:
+    """Defaults can be dropped, and interruptible is sent as bid."""
+    server.responses['/api/v0/bundles'] = [(200, b'{"offers": []}')]
+    client.search_offers(
+        type='interruptible',
+        search_query='num_gpus=2',
+        sort_order='',
+        no_default=True,
+        disable_bundling=True,
+    )
+    client.search_offers(search_query='num_gpus=2')
+    (_, _, first), (_, _, second) = server.requests
+    assert json.loads(first['q'][0]) == {
+        'num_gpus': {'eq': '2'},
+        'order': [],
+        'type': 'bid',
+        'disable_bundling': True,
+    }
+    # The default filters are copied, not changed, by a search.
+    assert json.loads(second['q'][0])['verified'] == {'eq': True}
+
+
+def test_search_offers_rejects_bad_query(client: VastClient) -> None:
+    """A malformed query raises before any request is sent."""
+    with pytest.raises(ValueError, match='Unknown operator'):
+        client.search_offers(search_query='gpu_ram')
@@ -0,0 +1,165 @@
+import re
+
+import pytest
+
+from vastai_client.models import QueryType
+from vastai_client.vast_utils import (
+    parse_env,
+    parse_query,
+    parse_vast_url,
+    translate_null_strings_to_blanks,
+)
+
+
+@pytest.mark.parametrize(
+    ('query', 'expected'),
+    [
+        ('gpu_ram=24', {'gpu_ram': {'eq': '24000'}}),
+        ('gpu_ram in [24,48]', {'gpu_ram': {'in': ['24000', '48000']}}),
+        ('cpu_ram notin [1.5]', {'cpu_ram': {'notin': ['1500.0']}}),
+        ('duration in [86400, 43200]', {'duration': {'in': ['1.0', '0.5']}}),
+    ],
+)
+def test_parse_query_scales_values(query: str, expected: QueryType) -> None:
+    """Scaled fields are scaled in list values too."""
+    assert parse_query(query) == expected
+
+
+@pytest.mark.parametrize(
+    ('query', 'expected'),
+    [
+        (
+            'gpu_ram>=24 num_gpus=2',
+            {'gpu_ram': {'gte': '24000'}, 'num_gpus': {'eq': '2'}},
+        ),
+        ('num_gpus = 2', {'num_gpus': {'eq': '2'}}),
+        ('external=false', {'external': {'eq': 'false'}}),
+        ('rentable=any', {}),
+        ('gpu_name=RTX_3090', {'gpu_name': {'eq': 'RTX 3090'}}),
+        ('gpu_name=[RTX_4090]', {'gpu_name': {'eq': 'RTX 4090'}}),
+        (
+            'gpu_name in [RTX_3090,RTX_4090]',
+            {'gpu_name': {'in': ['RTX 3090', 'RTX 4090']}},
+        ),
+        ('num_gpus notin [1, 2]', {'num_gpus': {'notin': ['1', '2']}}),
+        ('cuda_vers >= 11.8', {'cuda_max_good': {'gte': '11.8'}}),
+        (
+            'reliability>0.99 dph<1',
+            {'reliability2': {'gt': '0.99'}, 'dph_total': {'lt': '1'}},
+        ),
+        # An alias and its target are the same field; the last one wins.
+        ('dph<1 dph_total<2', {'dph_total': {'lt': '2'}}),
+        # Brackets and commas around a value are stripped, however many.
+        ('num_gpus=,2,', {'num_gpus': {'eq': '2'}}),
+        ('gpu_name=[[RTX_4090]', {'gpu_name': {'eq': 'RTX 4090'}}),
+        ('gpu_name in [[,RTX_4090]', {'gpu_name': {'in': ['RTX 4090']}}),
+        # Long runs of brackets and commas must not make matching quadratic.
+        (
+            'num_gpus=[' + ',' * 8000 + '2' + ',' * 8000 + ']',
+            {'num_gpus': {'eq': '2'}},
+        ),
+        ('num_gpus=' + '[,' * 8000 + '2', {'num_gpus': {'eq': '2'}}),
+    ],
+)
+def test_parse_query(query: str, expected: QueryType) -> None:
+    """Queries parse into the filter sent to the API."""
+    assert parse_query(query) == expected
+
+
+@pytest.mark.parametrize(
+    ('query', 'message'),
+    [
+        ('gpu_ram', "Unknown operator. Did you forget to quote your query? ''"),
+        ('gpu_ram~5', "Unknown operator. Did you forget to quote your query? ''"),
+        (
+            'gpu_ram=',
+            'Value cannot be blank. Did you forget to quote your query? '
+            "('gpu_ram', '=', '')",
+        ),
+        (
+            'gpu_ram= [[]',
+            'Value cannot be blank. Did you forget to quote your query? '
+            "('gpu_ram', '=', '')",
+        ),
+        (
+            'gpu_name in []',
+            'Value cannot be blank. Did you forget to quote your query? '
+            "('gpu_name', 'in', [])",
+        ),
+        (
+            'num_gpus in [,1,[2],]',
+            "Unconsumed text. Did you forget to quote your query? ',]' "
+            "at position 19 of 'num_gpus in [,1,[2],]'",
+        ),
+    ],
+)
+def test_parse_query_errors(query: str, message: str) -> None:
+    """Malformed queries are rejected with a pointer to the problem."""
+    with pytest.raises(ValueError, match=f'^{re.escape(message)}$'):
+        parse_query(query)
+
+
+@pytest.mark.parametrize(
+    ('envs', 'expected'),
+    [
+        (None, {}),
+        ('', {}),
+        ('-e A=b', {'A': 'b'}),
+        ('-e A=b -e C=d', {'A': 'b', 'C': 'd'}),
+        ('-e A=b=c', {'A': 'b=c'}),
+        ('-e A', {}),
+        ('-p 8080:8080', {'-p 8080:8080': '1'}),
+        ('-e A=b -p 10831:22', {'A': 'b', '-p 10831:22': '1'}),
+        # Parsing stops at the first malformed option.
+        ('-e A=b  -e C=d', {'A': 'b'}),
+        ('junk -e A=b', {}),
+    ],
+)
+def test_parse_env(envs: str | None, expected: dict[str, str]) -> None:
+    """Docker options parse into environment variables and ports."""
+    assert parse_env(envs) == expected
+
+
+@pytest.mark.parametrize(
+    ('url', 'expected'),
+    [
+        ('123:/a', (123, '/a')),
+        ('123:a/b', (123, 'a/b')),
+        ('/a', (None, '/a')),
+    ],
+)
+def test_parse_vast_url(url: str, expected: tuple[int | None, str]) -> None:
+    """Vast urls split into an instance id and a path."""
+    assert parse_vast_url(url) == expected
+
+
+@pytest.mark.parametrize(
+    ('url', 'message'),
+    [
+        ('a:b:c', 'Invalid VRL (Vast resource locator).'),
+        ('x:/a', 'Instance id must be an integer.'),
+        ('123:', 'Path component:  of VRL is not a valid Unix style path.'),
+    ],
+)
+def test_parse_vast_url_errors(url: str, message: str) -> None:
+    """Malformed vast urls are rejected."""
+    with pytest.raises(ValueError, match=f'^{re.escape(message)}$'):
+        parse_vast_url(url)
+
+
+@pytest.mark.parametrize(
+    ('row', 'expected'),
+    [
+        ({'a': 0, 'b': 'x'}, {'a': 0, 'b': 'x'}),
+        ({'a': 0, 'b': ''}, {'a': 0, 'b': ' '}),
+        (
+            {'a': None, 'b': False, 'c': '', 'd': 0.0},
+            {'a': None, 'b': False, 'c': ' ', 'd': 0.0},
+        ),
+    ],
+)
+def test_translate_null_strings_to_blanks(
+    row: dict[str, object], expected: dict[str, object]
+) -> None:
+    """Only empty strings are blanked; other falsy values are kept."""
+    assert translate_null_strings_to_blanks(row) == expected  # type: ignore[arg-type]
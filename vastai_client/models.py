@@ -1,13 +1,196 @@
-from dataclasses import dataclass
+from __future__ import annotations
 
-QueryType = dict[str, bool | str | list[list[str]] | dict[str, str | bool]]
+from collections import OrderedDict
+from copy import copy
+from enum import Enum
+from functools import lru_cache
+from operator import attrgetter
+from typing import Iterable, Mapping, TypeVar, cast
 
+import msgspec
 
-@dataclass
-class Instance:
+QueryType = dict[
+    str, bool | str | list[list[str]] | dict[str, str | bool | list[str]]
+]
+
+_encoder = msgspec.json.Encoder()
+
+
+def dumps(obj: object) -> bytes:
+    """Serialize models, lists of models or plain data to JSON.
+
+    Reuses one module-level encoder and writes Structs straight from their
+    slots, without building intermediate dicts.
+
+    Args:
+        obj (object): value to serialize.
+
+    Returns
+    -------
+        bytes: compact JSON.
+    """
+    return _encoder.encode(obj)
+
+
+def encode_query(query: QueryType) -> str:
+    """Serialize a search query to the JSON expected in the `q` url parameter.
+
+    Args:
+        query (QueryType): query built by `parse_query`.
+
+    Returns
+    -------
+        str: compact JSON representation of the query.
+    """
+    return dumps(query).decode()
+
+
+class _StrEnum(str, Enum):
+
+    """Enum whose members are their string values."""
+
+    def __str__(self) -> str:
+        """Render as the plain value, like the string the API sent."""
+        return str.__str__(self)
+
+    def __format__(self, format_spec: str) -> str:
+        """Format as the plain value."""
+        return str.__format__(self, format_spec)
+
+
+class InstanceState(_StrEnum):
+
+    """Known values of the instance status fields.
+
+    Members compare equal to the raw strings, so `inst.cur_state == 'running'`
+    keeps working, while `inst.cur_state is InstanceState.RUNNING` is a
+    plain identity check.
+    """
+
+    CREATED = 'created'
+    LOADING = 'loading'
+    RUNNING = 'running'
+    EXITED = 'exited'
+    STOPPED = 'stopped'
+    OFFLINE = 'offline'
+
+
+class Verification(_StrEnum):
+
+    """Known values of the `verification` field."""
+
+    VERIFIED = 'verified'
+    UNVERIFIED = 'unverified'
+    DEVERIFIED = 'deverified'
+
+
+_states = {state.value: state for state in InstanceState}
+_verifications = {status.value: status for status in Verification}
+
+# Fields whose known values are replaced by the matching enum member.
+_enum_members: dict[str, Mapping[str, _StrEnum]] = {
+    'actual_status': _states,
+    'cur_state': _states,
+    'intended_status': _states,
+    'next_state': _states,
+    'verification': _verifications,
+}
+_no_members: Mapping[str, _StrEnum] = {}
+
+# String fields that take only a handful of distinct values across offers.
+_machine_interned_fields = (
+    'cpu_name',
+    'disk_name',
+    'driver_version',
+    'geolocation',
+    'gpu_name',
+    'mobo_name',
+    'verification',
+)
+_instance_interned_fields = _machine_interned_fields + (
+    'actual_status',
+    'cur_state',
+    'intended_status',
+    'next_state',
+)
+
+
+@lru_cache(maxsize=4096)
+def _intern(value: str) -> str:
+    """Return a shared copy of `value`.
+
+    `lru_cache` hands back the object it first stored for an equal key,
+    which makes it a size-bounded intern table.
+    """
+    return value
+
+
+def _intern_fields(obj: msgspec.Struct, names: tuple[str, ...]) -> None:
+    for name in names:
+        value = getattr(obj, name)
+        if value is not None:
+            member = _enum_members.get(name, _no_members).get(value)
+            setattr(obj, name, _intern(value) if member is None else member)
+
+
+_ModelT = TypeVar('_ModelT', bound='_Model')
+
+
+class _Model(msgspec.Struct, kw_only=True, omit_defaults=True, gc=False):
+
+    """Common base of the API models."""
+
+    @classmethod
+    def from_dict(cls: type[_ModelT], data: Mapping[str, object]) -> _ModelT:
+        """Build a model from an already parsed API row.
+
+        Unknown keys are ignored and values are type-checked, all in C.
+
+        Args:
+            data (Mapping[str, object]): one row of an API response.
+
+        Returns
+        -------
+            The model populated from `data`.
+        """
+        return msgspec.convert(data, cls)
+
+    @classmethod
+    def blank(cls: type[_ModelT]) -> _ModelT:
+        """Model with every field at its default.
+
+        Copies a cached prototype, which is cheaper than running `__init__`
+        and `__post_init__` for each object when many are filled in by hand.
+
+        Returns
+        -------
+            A fresh model with default field values.
+        """
+        prototype = _prototypes.get(cls)
+        if prototype is None:
+            prototype = _prototypes[cls] = cls()
+        return cast(_ModelT, copy(prototype))
+
+    def to_dict(self) -> dict[str, object]:
+        """Shallow dict of all fields, without the recursive copy of `dataclasses.asdict`."""
+        return msgspec.structs.asdict(self)
+
+
+_prototypes: dict[type[_Model], _Model] = {}
+
+
+class Instance(_Model, kw_only=True):
 
     """Class for storing information about a created instance."""
 
+    # Fields most often read by filters and sorts come first.
+    id: int | None = None
+    dph_total: float | None = None
+    gpu_ram: int | None = None
+    num_gpus: int | None = None
+    reliability2: float | None = None
+    dlperf: float | None = None
+
     actual_status: str | None = None
     bundle_id: int | None = None
     bw_nvlink: float | None = None
@@ -26,10 +209,8 @@ class Instance:
     disk_name: str | None = None
     disk_space: float | None = None
     disk_util: int | None = None
-    dlperf: float | None = None
     dlperf_per_dphtotal: float | None = None
     dph_base: float | None = None
-    dph_total: float | None = None
     driver_version: str | None = None
     duration: float | None = None
     end_date: str | None = None
@@ -41,14 +222,12 @@ class Instance:
     gpu_lanes: int | None = None
     gpu_mem_bw: float | None = None
     gpu_name: str | None = None
-    gpu_ram: int | None = None
     gpu_temp: float | None = None
     gpu_util: float | None = None
     has_avx: int | None = None
     host_id: int | None = None
     hosting_type: int | None = None
-    id: int | None = None
-    image_args: list[str] | None = None
+    image_args: tuple[str, ...] | None = ()
     image_runtype: str | None = None
     image_uuid: str | None = None
     inet_down: float | None = None
@@ -70,12 +249,10 @@ class Instance:
     min_bid: float | None = None
     mobo_name: str | None = None
     next_state: str | None = None
-    num_gpus: int | None = None
     pci_gen: float | None = None
     pcie_bw: float | None = None
-    ports: list[int] | None = None
+    ports: tuple[int, ...] | None = ()
     public_ipaddr: str | None = None
-    reliability2: float | None = None
     rentable: bool | None = None
     score: float | None = None
     ssh_host: str | None = None
@@ -90,12 +267,23 @@ class Instance:
     vmem_usage: float | None = None
     webpage: str | None = None
 
+    def __post_init__(self) -> None:
+        """Share repeated string values between instances."""
+        _intern_fields(self, _instance_interned_fields)
 
-@dataclass
-class Machine:
+
+class Machine(_Model, kw_only=True):
 
     """Class for storing information about a listed machine."""
 
+    # Fields most often read by filters and sorts come first.
+    id: int | None = None
+    dph_total: float | None = None
+    gpu_ram: int | None = None
+    num_gpus: int | None = None
+    reliability2: float | None = None
+    dlperf: float | None = None
+
     bundle_id: int | None = None
     bundled_results: int | None = None
     bw_nvlink: float | None = None
@@ -109,10 +297,8 @@ class Machine:
     disk_bw: float | None = None
     disk_name: str | None = None
     disk_space: float | None = None
-    dlperf: float | None = None
     dlperf_per_dphtotal: float | None = None
     dph_base: float | None = None
-    dph_total: float | None = None
     driver_version: str | None = None
     duration: float | None = None
     end_date: float | None = None
@@ -124,11 +310,9 @@ class Machine:
     gpu_lanes: int | None = None
     gpu_mem_bw: float | None = None
     gpu_name: str | None = None
-    gpu_ram: int | None = None
     has_avx: int | None = None
     host_id: int | None = None
     hosting_type: int | None = None
-    id: int | None = None
     inet_down: float | None = None
     inet_down_billed: float | None = None
     inet_down_cost: float | None = None
@@ -140,12 +324,10 @@ class Machine:
     machine_id: int | None = None
     min_bid: float | None = None
     mobo_name: str | None = None
-    num_gpus: int | None = None
     pci_gen: float | None = None
     pcie_bw: float | None = None
     pending_count: int | None = None
     public_ipaddr: str | None = None
-    reliability2: float | None = None
     rented: bool | None = None
     rentable: bool | None = None
     score: float | None = None
@@ -155,3 +337,115 @@ class Machine:
     total_flops: float | None = None
     verification: str | None = None
     webpage: str | None = None
+
+    def __post_init__(self) -> None:
+        """Share repeated string values between machines."""
+        _intern_fields(self, _machine_interned_fields)
+
+
+instance_fields: tuple[str, ...] = Instance.__struct_fields__
+machine_fields: tuple[str, ...] = Machine.__struct_fields__
+
+_getters = {name: attrgetter(name) for name in instance_fields + machine_fields}
+
+
+def column(items: Iterable[_Model], name: str) -> list[object]:
+    """Extract one field from every model, e.g. `column(offers, 'dph_total')`.
+
+    Uses a cached `operator.attrgetter`, so the loop stays in C.
+
+    Args:
+        items (Iterable[_Model]): instances or machines.
+        name (str): field name.
+
+    Returns
+    -------
+        list[object]: the field value of each item, in order.
+    """
+    return list(map(_getters[name], items))
+
+
+class InstanceCache:
+
+    """LRU of decoded instances keyed by id.
+
+    Polling `/instances` returns the same rows again and again. Passing each
+    decoded batch through `update` hands back the object already known for
+    an id, with only the changed fields overwritten, so object identity
+    stays stable between polls.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        """InstanceCache constructor.
+
+        Args:
+            maxsize (int, optional): number of instances to keep. Defaults to 4096.
+        """
+        self.maxsize = maxsize
+        self._items: OrderedDict[int, Instance] = OrderedDict()
+
+    def update(self, instances: list[Instance]) -> list[Instance]:
+        """Merge freshly decoded instances into the cache.
+
+        Args:
+            instances (list[Instance]): instances from the latest response.
+
+        Returns
+        -------
+            list[Instance]: the cached object for every instance, in order.
+        """
+        result = []
+        for fresh in instances:
+            instance_id = fresh.id
+            if instance_id is None:
+                result.append(fresh)
+                continue
+            cached = self._items.get(instance_id)
+            if cached is None:
+                self._items[instance_id] = fresh
+                result.append(fresh)
+                continue
+            self._items.move_to_end(instance_id)
+            for name in instance_fields:
+                value = getattr(fresh, name)
+                if getattr(cached, name) != value:
+                    setattr(cached, name, value)
+            result.append(cached)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+        return result
+
+    def invalidate(self, instance_id: int) -> None:
+        """Forget an instance, e.g. after destroying it.
+
+        Args:
+            instance_id (int): id of the instance.
+        """
+        self._items.pop(instance_id, None)
+
+
+class InstancesResponse(msgspec.Struct):
+
+    """Body of the `/instances` endpoint."""
+
+    instances: list[Instance]
+
+
+class OffersResponse(msgspec.Struct):
+
+    """Body of the `/bundles` endpoint."""
+
+    offers: list[Machine]
+
+
+class MachinesResponse(msgspec.Struct):
+
+    """Body of the `/machines` endpoint."""
+
+    machines: list[Machine]
+
+
+# Decoders cache the compiled schema, so they are built once per process.
+instances_decoder = msgspec.json.Decoder(InstancesResponse)
+offers_decoder = msgspec.json.Decoder(OffersResponse)
+machines_decoder = msgspec.json.Decoder(MachinesResponse)
@@ -0,0 +1,191 @@
+"""Columnar views over lists of models for bulk filtering and sorting.
+
+Requires the optional ``numpy`` dependency: ``pip install vastai-client[table]``.
+"""
+
+from operator import attrgetter
+from typing import Sequence
+
+import numpy as np
+from numpy.typing import DTypeLike, NDArray
+
+from vastai_client.models import Machine
+
+# Columns use narrow dtypes, which keeps filter and sort passes over large
+# offer lists cache friendly. Int columns are at least 32 bits wide, so one
+# unusual value cannot overflow the dtype and fail the whole table.
+float_columns: dict[str, DTypeLike] = {
+    'dph_total': np.float32,
+    'dlperf': np.float32,
+    'dlperf_per_dphtotal': np.float32,
+    'disk_space': np.float32,
+    'inet_down': np.float32,
+    'inet_up': np.float32,
+    'min_bid': np.float32,
+    'pci_gen': np.float32,
+    'reliability2': np.float16,
+    'score': np.float32,
+    'total_flops': np.float32,
+}
+int_columns: dict[str, DTypeLike] = {
+    'id': np.int64,
+    'machine_id': np.int64,
+    'cpu_cores': np.int32,
+    'cpu_ram': np.int32,
+    'gpu_lanes': np.int32,
+    'gpu_ram': np.int32,
+    'num_gpus': np.int32,
+}
+bool_columns = (
+    'external',
+    'rentable',
+    'rented',
+)
+str_columns = (
+    'geolocation',
+    'gpu_name',
+)
+columns = (
+    tuple(float_columns) + tuple(int_columns) + bool_columns + str_columns
+)
+
+_get_row = attrgetter(*columns)
+
+
+class MachineTable:
+
+    """Struct-of-arrays view of a list of machines.
+
+    Every column is a numpy array with one entry per machine, in the order
+    the machines were given, so `np.argsort(table.dph_total)` or
+    `table.gpu_ram >= 24000` index straight back into the source list.
+    Missing float values are NaN. Missing ints are 0 and missing bools are
+    False; use `is_missing` to tell them apart from real zeros.
+    """
+
+    __slots__ = columns + ('size', 'missing')
+
+    dph_total: NDArray[np.float32]
+    dlperf: NDArray[np.float32]
+    dlperf_per_dphtotal: NDArray[np.float32]
+    disk_space: NDArray[np.float32]
+    inet_down: NDArray[np.float32]
+    inet_up: NDArray[np.float32]
+    min_bid: NDArray[np.float32]
+    pci_gen: NDArray[np.float32]
+    reliability2: NDArray[np.float16]
+    score: NDArray[np.float32]
+    total_flops: NDArray[np.float32]
+    id: NDArray[np.int64]
+    machine_id: NDArray[np.int64]
+    cpu_cores: NDArray[np.int32]
+    cpu_ram: NDArray[np.int32]
+    gpu_lanes: NDArray[np.int32]
+    gpu_ram: NDArray[np.int32]
+    num_gpus: NDArray[np.int32]
+    external: NDArray[np.bool_]
+    rentable: NDArray[np.bool_]
+    rented: NDArray[np.bool_]
+    geolocation: NDArray[np.object_]
+    gpu_name: NDArray[np.object_]
+    size: int
+    missing: dict[str, NDArray[np.uint8]]
+
+    @classmethod
+    def from_instances(cls, items: Sequence[Machine]) -> 'MachineTable':
+        """Build the table from a list of machines.
+
+        Args:
+            items (Sequence[Machine]): machines, e.g. the result of `search_offers`.
+
+        Returns
+        -------
+            MachineTable: columnar view of `items`.
+        """
+        table = cls.__new__(cls)
+        table.size = len(items)
+        table.missing = {}
+        rows = list(map(_get_row, items))
+        by_column = dict(zip(columns, zip(*rows))) if rows else {}
+        for name, dtype in float_columns.items():
+            values = by_column.get(name, ())
+            setattr(table, name, np.array(values, dtype=dtype))
+        for name, dtype in int_columns.items():
+            values = by_column.get(name, ())
+            table.missing[name] = _none_mask(values)
+            setattr(
+                table,
+                name,
+                np.fromiter(
+                    (0 if v is None else v for v in values),
+                    dtype=dtype,
+                    count=table.size,
+                ),
+            )
+        for name in bool_columns:
+            values = by_column.get(name, ())
+            table.missing[name] = _none_mask(values)
+            setattr(
+                table,
+                name,
+                np.fromiter(map(bool, values), dtype=np.bool_, count=table.size),
+            )
+        for name in str_columns:
+            column = np.empty(table.size, dtype=np.object_)
+            column[:] = by_column.get(name, ())
+            setattr(table, name, column)
+        return table
+
+    def __len__(self) -> int:
+        """Return the number of machines in the table."""
+        return self.size
+
+    def is_missing(self, key: str) -> NDArray[np.bool_]:
+        """Mask of the machines for which the API did not return `key`.
+
+        Args:
+            key (str): name of a column.
+
+        Returns
+        -------
+            NDArray[np.bool_]: True where the value was None.
+        """
+        if key in self.missing:
+            return np.unpackbits(self.missing[key], count=self.size).view(np.bool_)
+        values = getattr(self, key)
+        if key in float_columns:
+            return np.isnan(values)
+        return values == None  # noqa: E711 - elementwise comparison
+
+    def top_k(self, key: str, k: int, descending: bool = False) -> NDArray[np.intp]:
+        """Return indices of the `k` best machines by a numeric column.
+
+        Uses `np.argpartition`, so only the selected `k` entries are sorted.
+        Missing values always come last, including ints stored as 0.
+
+        Args:
+            key (str): name of a numeric column, e.g. 'dph_total'.
+            k (int): number of indices to return.
+            descending (bool): pick the largest values instead of the smallest.
+
+        Returns
+        -------
+            NDArray[np.intp]: indices into the source list, best first.
+        """
+        # A float copy lets missing ints become NaN, which sorts last.
+        values = getattr(self, key).astype(np.float64)
+        if key in self.missing:
+            values[self.is_missing(key)] = np.nan
+        if descending:
+            values = -values
+        k = min(k, self.size)
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        selected = np.argpartition(values, k - 1)[:k]
+        return selected[np.argsort(values[selected], kind='stable')]
+
+
+def _none_mask(values: Sequence[object]) -> NDArray[np.uint8]:
+    return np.packbits(
+        np.fromiter((v is None for v in values), dtype=np.bool_, count=len(values))
+    )
@@ -1,41 +1,90 @@
 #!/usr/bin/env python3
 
-from __future__ import print_function, unicode_literals
-
-import json
-import os
 import sys
 import time
-from dataclasses import asdict
-from dacite import from_dict
-
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Mapping, TypeVar
+from urllib.parse import urlencode
 
+import msgspec
 import requests
 from loguru import logger
-from vastai_client.models import Instance, Machine, QueryType
-from vastai_client.vast_utils import parse_env, parse_query, parse_vast_url
-
-try:
-    from urllib import quote_plus  # type: ignore # Python 2.X
-except ImportError:
-    from urllib.parse import quote_plus  # Python 3+
-
-try:
-    JSONDecodeError = json.JSONDecodeError
-except AttributeError:
-    JSONDecodeError = ValueError  # type: ignore
-
-try:
-    input = raw_input  # type: ignore
-except NameError:
-    pass
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from vastai_client.models import (
+    Instance,
+    InstanceCache,
+    Machine,
+    QueryType,
+    encode_query,
+    instances_decoder,
+    machines_decoder,
+    offers_decoder,
+)
+from vastai_client.vast_utils import (
+    field_alias,
+    parse_env,
+    parse_query,
+    parse_vast_url,
+)
 
 
 # server_url_default = "https://vast.ai"
 server_url_default = "https://console.vast.ai"
 # server_url_default  = "https://vast.ai/api/v0"
 api_key_file_base = "~/.vast_api_key"
-api_key_file = os.path.expanduser(api_key_file_base)
+api_key_path = Path(api_key_file_base).expanduser()
+api_key_file = str(api_key_path)
+
+# Transient failures are retried with exponential backoff. Final error statuses
+# are still returned so that `raise_for_status` reports them as before.
+# DELETE is left out: a destroy whose response was lost would be retried into
+# a 404 and reported as a failure although the instance is gone.
+retries = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({'GET', 'PUT'}),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+# Filters applied by `search_offers` unless `no_default` is set.
+default_query: dict[str, dict[str, str | bool]] = {
+    'verified': {'eq': True},
+    'external': {'eq': False},
+    'rentable': {'eq': True},
+}
+# Keys are sorted so the displayed json is stable between calls.
+sorted_encoder = msgspec.json.Encoder(order='sorted')
+# requests drops session params that a request overrides with None.
+no_api_key = {'api_key': None}
+# Statuses with which static file hosts refuse a HEAD they would serve as GET.
+head_refused_statuses = frozenset({403, 405})
+# Connections kept per host; also the most requests the bulk helpers run at once.
+pool_maxsize = 20
+# Endpoints that create something, run a command or reboot must not be sent twice.
+non_idempotent_subpaths = (
+    '/asks/',
+    '/commands/',
+    '/instances/command/',
+    '/instances/reboot/',
+)
+
+_T = TypeVar('_T')
+
+
+def _decode(r: requests.Response, decode: Callable[[bytes], _T]) -> _T:
+    """Decode a response body with `decode`.
+
+    A malformed body raises `requests.exceptions.InvalidJSONError`, like
+    `Response.json` did, so callers catching `requests.RequestException`
+    still see it.
+    """
+    try:
+        return decode(r.content)
+    except msgspec.DecodeError as e:
+        raise requests.exceptions.InvalidJSONError(str(e), response=r) from e
 
 
 class VastClient:
@@ -46,28 +95,61 @@ class VastClient:
         self,
         api_key: str | None = None,
         url: str = server_url_default,
-        api_key_file: str = api_key_file,
+        api_key_file: str | Path = api_key_path,
     ):
         """VastClient constructor.
         Args:
             api_key (str | None, optional): api key. Defaults to None.
             url (str, optional): server REST api url. Defaults to server_url_default.
-            api_key_file (str, optional): file where api key is stored. Defaults to api_key_file_base.
+            api_key_file (str | Path, optional): file where api key is stored. Defaults to api_key_file_base.
 
         Raises
         ------
             ValueError: Must provide `api_key` or `api_key_file_base` where the key is stored.
         """
         self.url = url
-        if api_key is None and not os.path.exists(api_key_file):
-            raise ValueError(
-                "Must provide `api_key` or `api_key_file_base` where the key is stored."
-            )
-        elif api_key:
+        self._instance_cache = InstanceCache()
+        self._instances_snapshot: tuple[float, dict[int, Instance]] | None = None
+        if api_key:
             self.api_key = api_key
         else:
-            with open(api_key_file, 'r') as f:
-                self.api_key = f.read().strip()
+            try:
+                self.api_key = Path(api_key_file).read_text().strip()
+            except FileNotFoundError:
+                raise ValueError(
+                    "Must provide `api_key` or `api_key_file_base` where the key is stored."
+                ) from None
+        self._api_base = f'{url}/api/v0'
+        # The listing endpoints are polled with a fixed query, so their urls
+        # are built once instead of going through `apiurl` on every call.
+        self._instances_url = f'{self._api_base}/instances?owner=me'
+        self._machines_url = f'{self._api_base}/machines?owner=me'
+        # One session per client keeps connections to the API alive between calls.
+        self._session = requests.Session()
+        # requests merges session params into every request, so urls built by
+        # `apiurl` never have to carry the key.
+        self._session.params = {'api_key': self.api_key}
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize, max_retries=retries)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        # The longest matching prefix wins, so these override the retrying adapter.
+        for subpath in non_idempotent_subpaths:
+            self._session.mount(
+                self._api_base + subpath,
+                HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize),
+            )
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self._session.close()
+
+    def __enter__(self) -> 'VastClient':
+        """Use the client as a context manager that closes its connections."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the pooled HTTP connections."""
+        self.close()
 
     def apiurl(
         self,
@@ -77,29 +159,52 @@ class VastClient:
         """Creates the endpoint URL for a given combination of parameters.
 
         :param str subpath: added to end of URL to further specify endpoint.
-        :param typing.Dict query_args: specifics such as API key and search parameters that complete the URL.
+        :param typing.Dict query_args: specifics such as search parameters that complete the URL.
         :rtype str:
         """
-        if query_args is None:
-            query_args = {}
-
-        query_args["api_key"] = self.api_key
-
-        if query_args:
-            return (
-                self.url
-                + "/api/v0"
-                + subpath
-                + "?"
-                + "&".join(
-                    "{x}={y}".format(
-                        x=x, y=quote_plus(y if isinstance(y, str) else json.dumps(y))
-                    )
-                    for x, y in query_args.items()
-                )
-            )
-        else:
-            return self.url + "/api/v0" + subpath
+        if not query_args:
+            return self._api_base + subpath
+        query = urlencode(
+            {
+                x: y if isinstance(y, str) else encode_query(y)
+                for x, y in query_args.items()
+            }
+        )
+        return f'{self._api_base}{subpath}?{query}'
+
+    def _mutate(
+        self,
+        method: str,
+        subpath: str,
+        json_body: Mapping[str, object],
+        message: str,
+    ) -> bool:
+        """Send a state-changing request and report its outcome.
+
+        Args:
+            method (str): 'PUT' or 'DELETE'.
+            subpath (str): part of the url after the API version.
+            json_body (Mapping[str, object]): request body.
+            message (str): logged when the API reports success.
+
+        Returns
+        -------
+            bool: True if successful, False otherwise.
+        """
+        r = self._session.request(
+            method, self.apiurl(subpath), json=json_body, timeout=10
+        )
+        r.raise_for_status()
+        if r.status_code != 200:
+            logger.error(r.text)
+            logger.error(f'failed with error {r.status_code}')
+            return False
+        rj = _decode(r, msgspec.json.decode)
+        if not rj['success']:
+            logger.error(rj['msg'])
+            return False
+        logger.info(message)
+        return True
 
     def copy(self, src: str, dst: str, identity: str | None = None) -> None:
         """Copy directories between instances and/or local..
@@ -110,7 +215,6 @@ class VastClient:
         dst (str): instance_id:/path to target of copy operation.
         identity (str | None, optional):  Location of ssh private key. Optional.
         """
-        url = self.apiurl('/commands/rsync/')
         src_id, src_path = parse_vast_url(src)
         dst_id, dst_path = parse_vast_url(dst)
         logger.info(f'copying {src_id}:{src_path} {dst_id}:{dst_path}')
@@ -121,19 +225,12 @@ class VastClient:
             'src_path': src_path,
             'dst_path': dst_path,
         }
-        r = requests.put(url, json=req_json, timeout=10)
-        r.raise_for_status()
-        if r.status_code == 200:
-            rj = r.json()
-            if rj['success']:
-                logger.info(
-                    'Remote to Remote copy initiated - check instance status bar for progress updates (~30 seconds delayed).'
-                )
-            else:
-                logger.error(rj['msg'])
-        else:
-            logger.error(r.text)
-            logger.error('failed with error {r.status_code}'.format(**locals()))
+        self._mutate(
+            'PUT',
+            '/commands/rsync/',
+            req_json,
+            'Remote to Remote copy initiated - check instance status bar for progress updates (~30 seconds delayed).',
+        )
 
     def search_offers(
         self,
@@ -216,21 +313,13 @@ class VastClient:
         disable_bundling (bool): Show identical offers. This request is more heavily rate limited. (default: False)
         storage (float): Amount of storage to use for pricing, in GiB. default=5.0GiB (default: 5.0).
         """
-        field_alias = {
-            'cuda_vers': 'cuda_max_good',
-            'reliability': 'reliability2',
-            'dlperf_usd': 'dlperf_per_dphtotal',
-            'dph': 'dph_total',
-            'flops_usd': 'flops_per_dphtotal',
-        }
         try:
             if no_default:
                 query: QueryType = {}
             else:
+                # parse_query updates the per-field dicts in place, so copy them.
                 query = {
-                    'verified': {'eq': True},
-                    'external': {'eq': False},
-                    'rentable': {'eq': True},
+                    field: dict(ops) for field, ops in default_query.items()
                 }
             if search_query is not None:
                 query = parse_query(search_query, query)
@@ -239,13 +328,9 @@ class VastClient:
                 name = name.strip()
                 if not name:
                     continue
-                direction = 'asc'
-                if name.strip('-') != name:
-                    direction = 'desc'
                 field = name.strip('-')
-                if field in field_alias:
-                    field = field_alias[field]
-                order.append([field, direction])
+                direction = 'asc' if field == name else 'desc'
+                order.append([field_alias.get(field, field), direction])
             query['order'] = order
             query['type'] = type
             if query['type'] == 'interruptible':
@@ -255,19 +340,49 @@ class VastClient:
         except ValueError as e:
             logger.error('Error: ', e)
             raise e
-        url = self.apiurl('/bundles', {'q': query})
-        r = requests.get(url, timeout=10)
+        # Passed as a request param, so the json is quoted once by requests
+        # while it prepares the request rather than by apiurl beforehand.
+        r = self._session.get(
+            self.apiurl('/bundles'), params={'q': encode_query(query)}, timeout=10
+        )
         r.raise_for_status()
-        rows = r.json()['offers']
-        return [from_dict(data_class=Machine, data=row) for row in rows]
+        return _decode(r, offers_decoder.decode).offers
 
-    def get_instances(self) -> list[Instance]:
-        """Display user's current instances."""
-        req_url = self.apiurl('/instances', {'owner': 'me'})
-        r = requests.get(req_url, timeout=10)
+    def get_instances(self, reuse_objects: bool = False) -> list[Instance]:
+        """Display user's current instances.
+
+        Args:
+            reuse_objects (bool, optional): hand back the objects returned by
+                earlier calls for the same ids, updated in place, so identity
+                stays stable between polls. Objects kept from an earlier call
+                then show the latest values too, so compare states within one
+                call, not across calls. Defaults to False, which returns fresh
+                snapshots.
+
+        Returns
+        -------
+            list[Instance]: user's instances.
+        """
+        r = self._session.get(self._instances_url, timeout=10)
         r.raise_for_status()
-        rows = r.json()['instances']
-        return [from_dict(data_class=Instance, data=row) for row in rows]
+        instances = _decode(r, instances_decoder.decode).instances
+        if reuse_objects:
+            return self._instance_cache.update(instances)
+        return instances
+
+    def _instances_by_id(self, ttl: float = 2.0) -> dict[int, Instance]:
+        """User's instances keyed by id.
+
+        A response fetched less than `ttl` seconds ago is reused, so helpers
+        such as `ssh_url` and `scp_url` called back to back share one request.
+        """
+        if self._instances_snapshot is not None:
+            fetched_at, by_id = self._instances_snapshot
+            if time.monotonic() - fetched_at < ttl:
+                return by_id
+        by_id = {inst.id: inst for inst in self.get_instances() if inst.id is not None}
+        self._instances_snapshot = (time.monotonic(), by_id)
+        return by_id
 
     def ssh_url(self, instance_id: int) -> str | None:
         """ssh url helper.
@@ -298,29 +413,31 @@ class VastClient:
         -------
             str | None: constructed ssh url.
         """
-        req_url = self.apiurl("/instances", {"owner": "me"})
-        r = requests.get(req_url, timeout=10)
-        r.raise_for_status()
-        rows = r.json()["instances"]
+        instances = self._instances_by_id()
         if instance_id:
-            (instance,) = [r for r in rows if r['id'] == instance_id]
-        elif len(rows) > 1:
+            instance = instances.get(instance_id)
+            if instance is None:
+                logger.error(f'Instance {instance_id} not found')
+                return None
+        elif len(instances) > 1:
             logger.error("Found multiple running instances")
             return None
         else:
-            (instance,) = rows
-        return f'{protocol}root@{instance["ssh_host"]}:{instance["ssh_port"]}'
+            (instance,) = instances.values()
+        return f'{protocol}root@{instance.ssh_host}:{instance.ssh_port}'
+
+    def _hosted_machines_response(self) -> requests.Response:
+        r = self._session.get(self._machines_url, timeout=10)
+        r.raise_for_status()
+        return r
 
     def get_hosted_machines(self, quiet: bool) -> list[Machine]:
         """[Host] Returns hosted machines
         Args:
             quiet (bool): only display numeric ids.
         """
-        req_url = self.apiurl('/machines', {'owner': 'me'})
-        r = requests.get(req_url, timeout=10)
-        r.raise_for_status()
-        rows = r.json()['machines']
-        return [from_dict(data_class=Machine, data=row) for row in rows]
+        r = self._hosted_machines_response()
+        return _decode(r, machines_decoder.decode).machines
 
     def show_hosted_machines(self, quiet: bool, raw: bool) -> None:
         """[Host] Show hosted machines.
@@ -330,22 +447,19 @@ class VastClient:
         quiet (bool): only display numeric ids.
         raw (bool): print raw json.
         """
-        machines = self.get_hosted_machines(quiet)
-        rows = [asdict(machine) for machine in machines]
+        # Displays the rows as received, without building Machine objects.
+        rows = _decode(
+            self._hosted_machines_response(), msgspec.json.decode
+        )['machines']
         if raw:
-            logger.info(json.dumps(rows, indent=1, sort_keys=True))
+            logger.info(msgspec.json.format(sorted_encoder.encode(rows), indent=1).decode())
+        elif quiet:
+            logger.info('\n'.join(str(row['id']) for row in rows))
         else:
-            for machine in rows:
-                if quiet:
-                    logger.info('{id}'.format(id=machine['id']))
-                else:
-                    logger.info('{N} machines: '.format(N=len(rows)))
-                    logger.info(
-                        '{id}: {json}'.format(
-                            id=machine['id'],
-                            json=json.dumps(machine, indent=4, sort_keys=True),
-                        )
-                    )
+            logger.info(f'{len(rows)} machines: ')
+            for row in rows:
+                body = msgspec.json.format(sorted_encoder.encode(row), indent=4)
+                logger.info(f"{row['id']}: {body.decode()}")
 
     def reboot_instance(self, id: int) -> bool:
         """Reboot (stop/start) an instance
@@ -356,21 +470,9 @@ class VastClient:
         -------
             bool: True if successful, False otherwise.
         """
-        url = self.apiurl('/instances/reboot/{id}/'.format(id=id))
-        r = requests.put(url, json={}, timeout=10)
-        r.raise_for_status()
-        if r.status_code == 200:
-            rj = r.json()
-            if rj['success']:
-                logger.info('Rebooting instance {id}.'.format(**locals()))
-                return True
-            else:
-                logger.error(rj['msg'])
-                return False
-        else:
-            logger.error(r.text)
-            logger.error('failed with error {r.status_code}'.format(**locals()))
-            return False
+        return self._mutate(
+            'PUT', f'/instances/reboot/{id}/', {}, f'Rebooting instance {id}.'
+        )
 
     def start_instance(self, id: int) -> bool:
         """Start a stopped instance
@@ -381,21 +483,9 @@ class VastClient:
         -------
             bool: True if successful, False otherwise.
         """
-        url = self.apiurl('/instances/{id}/'.format(id=id))
-        r = requests.put(url, json={'state': 'running'}, timeout=10)
-        r.raise_for_status()
-        if r.status_code == 200:
-            rj = r.json()
-            if rj['success']:
-                logger.info('starting instance {id}.'.format(**locals()))
-                return True
-            else:
-                logger.error(rj['msg'])
-                return False
-        else:
-            logger.error(r.text)
-            logger.error('failed with error {r.status_code}'.format(**locals()))
-            return False
+        return self._mutate(
+            'PUT', f'/instances/{id}/', {'state': 'running'}, f'starting instance {id}.'
+        )
 
     def stop_instance(self, id: int) -> bool:
         """Stop a running instance
@@ -406,21 +496,9 @@ class VastClient:
         -------
             bool: True if successful, False otherwise.
         """
-        url = self.apiurl('/instances/{id}/'.format(id=id))
-        r = requests.put(url, json={'state': 'stopped'}, timeout=10)
-        r.raise_for_status()
-        if r.status_code == 200:
-            rj = r.json()
-            if rj['success']:
-                logger.info('stopping instance {id}.'.format(**locals()))
-                return True
-            else:
-                logger.error(rj['msg'])
-                return False
-        else:
-            logger.error(r.text)
-            logger.error('failed with error {r.status_code}'.format(**locals()))
-            return False
+        return self._mutate(
+            'PUT', f'/instances/{id}/', {'state': 'stopped'}, f'stopping instance {id}.'
+        )
 
     def label_instance(self, id: int, label: str) -> bool:
         """Assign a string label to an instance.
@@ -433,16 +511,12 @@ class VastClient:
         -------
             bool: True if successful, False otherwise.
         """
-        url = self.apiurl('/instances/{id}/'.format(id=id))
-        r = requests.put(url, json={'label': label}, timeout=10)
-        r.raise_for_status()
-        rj = r.json()
-        if rj['success']:
-            logger.info('label for {id} set to {label}.'.format(**locals()))
-            return True
-        else:
-            logger.error(rj['msg'])
-            return False
+        return self._mutate(
+            'PUT',
+            f'/instances/{id}/',
+            {'label': label},
+            f'label for {id} set to {label}.',
+        )
 
     def destroy_instance(self, id: int) -> bool:
         """Destroy an instance (irreversible, deletes data).
@@ -454,21 +528,95 @@ class VastClient:
         -------
             bool: True if successful, False otherwise.
         """
-        url = self.apiurl('/instances/{id}/'.format(id=id))
-        r = requests.delete(url, json={}, timeout=10)
-        r.raise_for_status()
-        if r.status_code == 200:
-            rj = r.json()
-            if rj['success']:
-                logger.info('destroying instance {id}.'.format(**locals()))
-                return True
-            else:
-                logger.error(rj['msg'])
-                return False
-        else:
-            logger.error(r.text)
-            logger.error('failed with error {r.status_code}'.format(**locals()))
+        if not self._mutate(
+            'DELETE', f'/instances/{id}/', {}, f'destroying instance {id}.'
+        ):
             return False
+        self._instance_cache.invalidate(id)
+        self._instances_snapshot = None
+        return True
+
+    def _for_each_instance(
+        self, action: Callable[[int], bool], ids: Iterable[int], max_workers: int
+    ) -> dict[int, bool]:
+        """Run `action` for every id concurrently over the shared session.
+
+        Any error for an id, from a failed request to a reply without the
+        expected keys, is logged and reported as False for that id, so the
+        results of the other ids are never lost.
+        """
+
+        def run(id: int) -> bool:
+            try:
+                return action(id)
+            except Exception:
+                logger.exception(f'instance {id} failed')
+                return False
+
+        ids = list(ids)
+        workers = max(1, min(max_workers, pool_maxsize, len(ids)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(ids, executor.map(run, ids)))
+
+    def reboot_instances(
+        self, ids: Iterable[int], max_workers: int = 8
+    ) -> dict[int, bool]:
+        """Reboot several instances concurrently.
+
+        Args:
+            ids (Iterable[int]): ids of instances to reboot.
+            max_workers (int, optional): requests in flight at once. Defaults to 8.
+
+        Returns
+        -------
+            dict[int, bool]: result of `reboot_instance` for every id.
+        """
+        return self._for_each_instance(self.reboot_instance, ids, max_workers)
+
+    def start_instances(
+        self, ids: Iterable[int], max_workers: int = 8
+    ) -> dict[int, bool]:
+        """Start several stopped instances concurrently.
+
+        Args:
+            ids (Iterable[int]): ids of instances to start.
+            max_workers (int, optional): requests in flight at once. Defaults to 8.
+
+        Returns
+        -------
+            dict[int, bool]: result of `start_instance` for every id.
+        """
+        return self._for_each_instance(self.start_instance, ids, max_workers)
+
+    def stop_instances(
+        self, ids: Iterable[int], max_workers: int = 8
+    ) -> dict[int, bool]:
+        """Stop several running instances concurrently.
+
+        Args:
+            ids (Iterable[int]): ids of instances to stop.
+            max_workers (int, optional): requests in flight at once. Defaults to 8.
+
+        Returns
+        -------
+            dict[int, bool]: result of `stop_instance` for every id.
+        """
+        return self._for_each_instance(self.stop_instance, ids, max_workers)
+
+    def destroy_instances(
+        self, ids: Iterable[int], max_workers: int = 8
+    ) -> dict[int, bool]:
+        """Destroy several instances concurrently (irreversible, deletes data).
+
+        Args:
+            ids (Iterable[int]): ids of instances to delete.
+            max_workers (int, optional): requests in flight at once. Defaults to 8.
+
+        Returns
+        -------
+            dict[int, bool]: result of `destroy_instance` for every id.
+        """
+        return self._for_each_instance(self.destroy_instance, ids, max_workers)
 
     def execute(self, ID: int, COMMAND: str) -> bool:
         """Execute a (constrained) remote command on a machine.
@@ -478,21 +626,12 @@ class VastClient:
         ID (int): id of instance to execute on.
         COMMAND (str): command to execute.
         """
-        url = self.apiurl('/instances/command/{id}/'.format(id=ID))
-        r = requests.put(url, json={'command': COMMAND}, timeout=10)
-        r.raise_for_status()
-        if r.status_code == 200:
-            rj = r.json()
-            if rj['success']:
-                logger.info('Executing {command} on instance {id}.'.format(**locals()))
-                return True
-            else:
-                logger.error(rj['msg'])
-                return False
-        else:
-            logger.error(r.text)
-            logger.error('failed with error {r.status_code}'.format(**locals()))
-            return False
+        return self._mutate(
+            'PUT',
+            f'/instances/command/{ID}/',
+            {'command': COMMAND},
+            f'Executing {COMMAND} on instance {ID}.',
+        )
 
     def logs(self, INSTANCE_ID: int, tail: str) -> bool:
         """Get the logs for an instance.
@@ -502,30 +641,38 @@ class VastClient:
         INSTANCE_ID (int): id of instance.
         tail (str): Number of lines to show from the end of the logs (default '1000').
         """
-        url = self.apiurl('/instances/request_logs/{id}/'.format(id=INSTANCE_ID))
+        url = self.apiurl(f'/instances/request_logs/{INSTANCE_ID}/')
         json = {}
         if tail:
             json['tail'] = tail
-        r = requests.put(url, json=json, timeout=10)
+        r = self._session.put(url, json=json, timeout=10)
         r.raise_for_status()
         if r.status_code == 200:
-            rj = r.json()
-            for i in range(0, 30):
-                time.sleep(1)
-                url = (
-                    self.url + '/static/docker_logs/C' + str(INSTANCE_ID & 255) + '.log'
-                )
+            rj = _decode(r, msgspec.json.decode)
+            static_url = f'{self.url}/static/docker_logs/C{INSTANCE_ID & 255}.log'
+            # Probe with cheap HEAD requests, backing off exponentially, and only
+            # download the log body once it exists.
+            deadline = time.monotonic() + 30
+            delay = 0.2
+            while time.monotonic() < deadline:
+                time.sleep(delay)
+                delay = min(delay * 1.7, 3.0)
                 logger.info(f'waiting on logs for instance {INSTANCE_ID}')
-                r = requests.get(url, timeout=10)
-                if r.status_code == 200:
-                    logger.info(r.text)
-                    return True
-            else:
-                logger.error(rj['msg'])
-                return False
+                # The log file is served statically; keep the session api key off it.
+                r = self._session.head(
+                    static_url, params=no_api_key, timeout=5, allow_redirects=True
+                )
+                # Hosts that refuse HEAD are asked for the body straight away.
+                if r.status_code == 200 or r.status_code in head_refused_statuses:
+                    r = self._session.get(static_url, params=no_api_key, timeout=10)
+                    if r.status_code == 200:
+                        logger.info(r.text)
+                        return True
+            logger.error(rj['msg'])
+            return False
         else:
             logger.error(r.text)
-            logger.error('failed with error {r.status_code}'.format(**locals()))
+            logger.error(f'failed with error {r.status_code}')
             return False
 
     def create_instance(
@@ -596,8 +743,8 @@ class VastClient:
             )
         if ssh:
             runtype = 'ssh_direct ssh_proxy' if direct else 'ssh_proxy'
-        url = self.apiurl('/asks/{id}/'.format(id=id))
-        r = requests.put(
+        url = self.apiurl(f'/asks/{id}/')
+        r = self._session.put(
             url,
             json={
                 'client_id': 'me',
@@ -620,9 +767,10 @@ class VastClient:
             timeout=10,
         )
         r.raise_for_status()
-        logger.info('Started. {}'.format(r.json()))
+        rj = _decode(r, msgspec.json.decode)
+        logger.info('Started. {}', rj)
 
-        return str(r.json())
+        return str(rj)
 
     def change_bid(self, id: int, price: float) -> None:
         """Change the bid price for a spot/interruptible instance.
@@ -632,19 +780,23 @@ class VastClient:
         id (int): id of instance type to change bid.
         price (float): per machine bid price in $/hour.
         """
-        url = self.apiurl('/instances/bid_price/{id}/'.format(id=id))
+        url = self.apiurl(f'/instances/bid_price/{id}/')
         logger.info(f'URL: {url}')
-        r = requests.put(url, json={'client_id': 'me', 'price': price}, timeout=10)
+        r = self._session.put(
+            url, json={'client_id': 'me', 'price': price}, timeout=10
+        )
         r.raise_for_status()
-        logger.info('Per gpu bid price changed: {}'.format(r.json()))
+        rj = _decode(r, msgspec.json.decode)
+        logger.info('Per gpu bid price changed: {}', rj)
 
     def reset_api_key(self) -> None:
         """Reset your api-key (get new key from website)."""
         logger.info('fml')
         url = self.apiurl('/commands/reset_apikey/')
-        r = requests.put(url, json={'client_id': 'me'}, timeout=10)
+        r = self._session.put(url, json={'client_id': 'me'}, timeout=10)
         r.raise_for_status()
-        logger.info('api-key reset {}'.format(r.json()))
+        rj = _decode(r, msgspec.json.decode)
+        logger.info('api-key reset {}', rj)
 
     def set_api_key(self, new_api_key: str) -> None:
         """Set api-key (get your api-key from the console/CLI).
@@ -653,6 +805,5 @@ class VastClient:
         ----
         new_api_key (str): Api key to set as currently logged in user.
         """
-        with open(api_key_file, 'w') as writer:
-            writer.write(new_api_key)
-        logger.info('Your api key has been saved in {}'.format(api_key_file))
+        api_key_path.write_text(new_api_key)
+        logger.info('Your api key has been saved in {}', api_key_path)
@@ -1,21 +1,23 @@
-from __future__ import print_function, unicode_literals
-
-import json
 import re
+from functools import lru_cache
+from types import MappingProxyType
 
 from loguru import logger
 
 from vastai_client.models import QueryType
 
-try:
-    JSONDecodeError = json.JSONDecodeError
-except AttributeError:
-    JSONDecodeError = ValueError  # type: ignore
-
-try:
-    input = raw_input  # type: ignore  # Python 2.X
-except NameError:
-    pass
+# Compiled once at import; `parse_vast_url` and `parse_env` run them per call.
+# The query pattern is built from `op_names` further down.
+# An optional `instance_id:` followed by a unix path: "/" or slash separated
+# names without empty components. Written without nested repeats, so a bad
+# path fails in linear time. Based on
+# https://stackoverflow.com/questions/537772/what-is-the-most-correct-regular-expression-for-a-unix-file-path
+_vrl_re = re.compile("(?:([0-9]+):)?(/|/?[^/\0:]+(?:/[^/\0:]+)*/?)")
+# One `-p ports` or `-e KEY=value` option of `parse_env`, with its separator.
+_env_option_re = re.compile(
+    "-p ([0-9:]*)(?: |$)"
+    "|-e ['\"]*([0-9A-Za-z_]+)=([0-9A-Za-z_=]*)['\"]*(?: |$)"
+)
 
 
 def translate_null_strings_to_blanks(d: dict[str, str]) -> dict[str, str]:
@@ -26,15 +28,10 @@ def translate_null_strings_to_blanks(d: dict[str, str]) -> dict[str, str]:
     :param Dict d: dict of item values.
     :rtype Dict:
     """
-
-    def translate_nulls(s: str) -> str:
-        # Beware: locally defined function.
-        if s == "":
-            return " "
-        return s
-
-    new_d = {k: translate_nulls(v) for k, v in d.items()}
-    return new_d
+    # Most rows have no empty values; a C-level scan and copy is enough then.
+    if "" not in d.values():
+        return dict(d)
+    return {k: " " if v == "" else v for k, v in d.items()}
 
 
 def parse_query(
@@ -58,30 +55,53 @@ def parse_query(
     if isinstance(query_str, list):
         query_str = " ".join(query_str)
     query_str = query_str.strip()
-    opts = re.findall(
-        (
-            "([a-zA-Z0-9_]+)"
-            "( *[=><!]+| +(?:[lg]te?|nin|neq|eq|not ?eq|not ?in|in) )"
-            "?( *)(\\[[^\\]]+\\]|[^ ]+)?( *)"
-        ),
-        query_str,
-    )
-
-    joined = "".join("".join(x) for x in opts)
-    if joined != query_str:
+    if len(query_str) <= _max_cached_query_len:
+        steps = _cached_query_steps(query_str)
+    else:
+        steps = _query_steps(query_str)
+    for field, op_name, value in steps:
+        if op_name is None:
+            res.pop(field, None)
+            continue
+        v = res.setdefault(field, {})
+        if isinstance(v, dict):
+            v[op_name] = list(value) if isinstance(value, tuple) else value
+    return res
+
+
+# A parsed query is replayed from these steps: (field, operator, value) sets a
+# condition, while (field, None, '') removes the field for a wildcard.
+_QueryStep = tuple[str, str | None, str | tuple[str, ...]]
+# Values that match anything, and operators that take a comma separated list.
+_wildcards = frozenset(("?", "*", "any"))
+_list_ops = frozenset(("in", "notin"))
+_list_sep_re = re.compile(r"\s*,\s*")
+
+
+def _query_steps(query_str: str) -> tuple[_QueryStep, ...]:
+    # A lone field name, as typed while completing a query, has no operator.
+    if query_str.isascii() and query_str.replace("_", "").isalnum():
+        raise ValueError("Unknown operator. Did you forget to quote your query? ''")
+    # Matches must follow each other without gaps; the first gap, or any
+    # text after the last match, is reported without rebuilding the string.
+    opts = []
+    end = 0
+    for match in _query_re.finditer(query_str):
+        if match.start() != end:
+            break
+        opts.append(match.groups(''))
+        end = match.end()
+    if end != len(query_str):
         raise ValueError(
             "Unconsumed text. Did you forget to quote your query? "
-            + repr(joined)
-            + " != "
+            + repr(query_str[end:])
+            + f" at position {end} of "
             + repr(query_str)
         )
-    for field, op, _, value, _ in opts:
-        value = value.strip(",[]")
-        if field not in res:
-            res[field] = {}
-        v = res[field]
-
-        op = op.strip()
+    steps: list[_QueryStep] = []
+    for field, symbol_op, word_op, listed, bare in opts:
+        op = symbol_op or word_op
+        value = (listed or bare).strip(",[]")
         op_name = op_names.get(op)
 
         if field in field_alias:
@@ -97,8 +117,18 @@ def parse_query(
                 "Unknown operator. Did you forget to quote your query? "
                 + repr(op).strip("u")
             )
-        if op_name in ["in", "notin"]:
-            value = [x.strip() for x in value.split(",") if x.strip()]
+        if op_name in _list_ops:
+            items = [x for x in _list_sep_re.split(value.strip()) if x]
+            if not items:
+                raise ValueError(
+                    "Value cannot be blank. Did you forget to quote your query? "
+                    + repr((field, op, items))
+                )
+            multiplier = field_multiplier.get(field)
+            if multiplier is not None:
+                items = [_scale(x, multiplier) for x in items]
+            steps.append((field, op_name, tuple(x.replace('_', ' ') for x in items)))
+            continue
         if not value:
             raise ValueError(
                 "Value cannot be blank. Did you forget to quote your query? "
@@ -109,26 +139,35 @@ def parse_query(
                 "Field cannot be blank. Did you forget to quote your query? "
                 + repr((field, op, value))
             )
-        if value in ["?", "*", "any"]:
+        if value in _wildcards:
             if op_name != "eq":
                 raise ValueError("Wildcard only makes sense with equals.")
-            if type(v) is dict:
-                if field in v:
-                    del v[field]
-            if field in res:
-                del res[field]
+            steps.append((field, None, ''))
             continue
 
-        if field in field_multiplier:
-            value = str(float(value) * field_multiplier[field])
+        multiplier = field_multiplier.get(field)
+        if multiplier is not None:
+            value = _scale(value, multiplier)
 
-        if type(v) is dict:
-            v[op_name] = value.replace('_', ' ')
-        res[field] = v
-    return res
+        steps.append((field, op_name, value.replace('_', ' ')))
+    return tuple(steps)
+
+
+def _scale(value: str, multiplier: float) -> str:
+    # Whole numbers times an int scale stay ints, skipping the float parse
+    # and repr; anything else keeps the float path.
+    if type(multiplier) is int and value.isdecimal():
+        return str(int(value) * multiplier)
+    return str(float(value) * multiplier)
+
+
+# Searches repeat the same few query strings; only their parse is cached, and
+# only for strings of a bounded size. Errors are not cached and raise again.
+_max_cached_query_len = 1024
+_cached_query_steps = lru_cache(maxsize=256)(_query_steps)
 
 
-def parse_vast_url(url_str: str) -> tuple[int, str]:
+def parse_vast_url(url_str: str) -> tuple[int | None, str]:
     """Breaks up a vast-style url in the form instance_id:path and does
         some basic sanity type-checking.
 
@@ -137,29 +176,21 @@ def parse_vast_url(url_str: str) -> tuple[int, str]:
 
     Returns
     -------
-         tuple: instance_id and path.
+         tuple: instance_id (None for a local path) and path.
     """
-    path = url_str
-    if ":" in url_str:
-        url_parts = url_str.split(":", 2)
-        if len(url_parts) == 2:
-            instance_id_str, path = url_parts
-        else:
+    match = _vrl_re.fullmatch(url_str)
+    if match is None:
+        # Cold path: find out which part is wrong for the error message.
+        instance_id_str, colon, path = url_str.rpartition(":")
+        if ":" in instance_id_str:
             raise ValueError("Invalid VRL (Vast resource locator).")
-
-        try:
-            instance_id = int(instance_id_str)
-        except Exception:
+        if colon and not instance_id_str.isdigit():
             raise ValueError("Instance id must be an integer.")
-
-    valid_unix_path_regex = re.compile('^(/)?([^/\0]+(/)?)+$')
-    # Got this regex from https://stackoverflow.com/questions/537772/what-is-the-most-correct-regular-expression-for-a-unix-file-path
-    if (path != "/") and (valid_unix_path_regex.match(path) is None):
         raise ValueError(
             f"Path component: {path} of VRL is not a valid Unix style path."
         )
-
-    return (instance_id, path)
+    instance_id, path = match.groups()
+    return (None if instance_id is None else int(instance_id), path)
 
 
 def parse_env(envs: str | None) -> dict[str, str]:
@@ -175,117 +206,128 @@ def parse_env(envs: str | None) -> dict[str, str]:
     result: dict[str, str] = {}
     if envs is None:
         return result
-    env = envs.split(' ')
-    prev = None
-    for e in env:
-        if prev is None:
-            if (e == "-e") or (e == "-p"):
-                prev = e
-            else:
-                return result
+    # Options must follow each other separated by single spaces; parsing stops
+    # at the first one that is malformed, keeping what was parsed before it.
+    end = 0
+    for match in _env_option_re.finditer(envs):
+        if match.start() != end:
+            break
+        port, key, value = match.groups()
+        if port is not None:
+            result["-p " + port] = "1"
         else:
-            if prev == "-p":  # type: ignore
-                if set(e).issubset(set("0123456789:")):
-                    result["-p " + e] = "1"
-                else:
-                    return result
-            elif prev == "-e":
-                e = e.strip(" '\"")
-                if set(e).issubset(
-                    set(
-                        "1234567890abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_="
-                    )
-                ):
-                    kv = e.split('=')
-                    result[kv[0]] = kv[1]
-                else:
-                    return result
-            prev = None
+            result[key] = value
+        end = match.end()
     return result
 
 
 # print(parse_env("-e TYZ=BM3828 -e BOB=UTC -p 10831:22 -p 8080:8080"))
 
 
-op_names = {
-    ">=": "gte",
-    ">": "gt",
-    "gt": "gt",
-    "gte": "gte",
-    "<=": "lte",
-    "<": "lt",
-    "lt": "lt",
-    "lte": "lte",
-    "!=": "neq",
-    "==": "eq",
-    "=": "eq",
-    "eq": "eq",
-    "neq": "neq",
-    "noteq": "neq",
-    "not eq": "neq",
-    "notin": "notin",
-    "not in": "notin",
-    "nin": "notin",
-    "in": "in",
-}
-
-field_alias = {
-    "cuda_vers": "cuda_max_good",
-    "display_active": "gpu_display_active",
-    "reliability": "reliability2",
-    "dlperf_usd": "dlperf_per_dphtotal",
-    "dph": "dph_total",
-    "flops_usd": "flops_per_dphtotal",
-}
-
-field_multiplier = {
-    "cpu_ram": 1000,
-    "gpu_ram": 1000,
-    "duration": 1.0 / (24.0 * 60.0 * 60.0),
-}
-
-fields = {
-    "bw_nvlink",
-    "compute_cap",
-    "cpu_cores",
-    "cpu_cores_effective",
-    "cpu_ram",
-    "cuda_max_good",
-    "direct_port_count",
-    "driver_version",
-    "disk_bw",
-    "disk_space",
-    "dlperf",
-    "dlperf_per_dphtotal",
-    "dph_total",
-    "duration",
-    "external",
-    "flops_per_dphtotal",
-    "gpu_display_active",
-    "gpu_mem_bw",
-    "gpu_name",
-    "gpu_ram",
-    "has_avx",
-    "host_id",
-    "id",
-    "inet_down",
-    "inet_down_cost",
-    "inet_up",
-    "inet_up_cost",
-    "machine_id",
-    "min_bid",
-    "mobo_name",
-    "num_gpus",
-    "pci_gen",
-    "pcie_bw",
-    "reliability2",
-    "rentable",
-    "rented",
-    "storage_cost",
-    "total_flops",
-    "verification",
-    "verified",
-}
+# Lookup tables are read-only; `fields` is frozen for fast membership tests.
+op_names: MappingProxyType[str, str] = MappingProxyType(
+    {
+        ">=": "gte",
+        ">": "gt",
+        "gt": "gt",
+        "gte": "gte",
+        "<=": "lte",
+        "<": "lt",
+        "lt": "lt",
+        "lte": "lte",
+        "!=": "neq",
+        "==": "eq",
+        "=": "eq",
+        "eq": "eq",
+        "neq": "neq",
+        "noteq": "neq",
+        "not eq": "neq",
+        "notin": "notin",
+        "not in": "notin",
+        "nin": "notin",
+        "in": "in",
+    }
+)
+
+# Word operators, longest first so that e.g. "not in" wins over "in"; they are
+# taken from `op_names` so the tokenizer and the lookup cannot drift apart.
+_word_ops = "|".join(
+    re.escape(op)
+    for op in sorted((op for op in op_names if op[0].isalpha()), key=len, reverse=True)
+)
+# Groups: field, symbol operator, word operator, value inside brackets, bare
+# value. Values keep their brackets and commas; each is stripped once later.
+_query_re = re.compile(
+    "([a-zA-Z0-9_]+)"
+    f"(?: *([=><!]+)| +({_word_ops}) )?"
+    " *"
+    "(?:\\[([^\\]]*)\\]|([^ ]+))?"
+    " *"
+)
+
+field_alias: MappingProxyType[str, str] = MappingProxyType(
+    {
+        "cuda_vers": "cuda_max_good",
+        "display_active": "gpu_display_active",
+        "reliability": "reliability2",
+        "dlperf_usd": "dlperf_per_dphtotal",
+        "dph": "dph_total",
+        "flops_usd": "flops_per_dphtotal",
+    }
+)
+
+field_multiplier: MappingProxyType[str, float] = MappingProxyType(
+    {
+        "cpu_ram": 1000,
+        "gpu_ram": 1000,
+        "duration": 1.0 / (24.0 * 60.0 * 60.0),
+    }
+)
+
+fields = frozenset(
+    {
+        "bw_nvlink",
+        "compute_cap",
+        "cpu_cores",
+        "cpu_cores_effective",
+        "cpu_ram",
+        "cuda_max_good",
+        "direct_port_count",
+        "driver_version",
+        "disk_bw",
+        "disk_space",
+        "dlperf",
+        "dlperf_per_dphtotal",
+        "dph_total",
+        "duration",
+        "external",
+        "flops_per_dphtotal",
+        "gpu_display_active",
+        "gpu_mem_bw",
+        "gpu_name",
+        "gpu_ram",
+        "has_avx",
+        "host_id",
+        "id",
+        "inet_down",
+        "inet_down_cost",
+        "inet_up",
+        "inet_up_cost",
+        "machine_id",
+        "min_bid",
+        "mobo_name",
+        "num_gpus",
+        "pci_gen",
+        "pcie_bw",
+        "reliability2",
+        "rentable",
+        "rented",
+        "storage_cost",
+        "total_flops",
+        "verification",
+        "verified",
+    }
+)
 
 all_fields = [
     "bundle_id",